@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+辦公日曆表共用模組
+下載、解碼、解析政府資料開放平台的 CSV，計算農曆資訊並寫出 JSON。
+update_calendar 與 validate_data 都從這裡取用，避免同一份邏輯各寫一份。
+"""
+
+import codecs
+import csv
+import gzip
+import json
+import re
+import zlib
+from dataclasses import asdict, dataclass
+from io import StringIO
+from urllib.request import urlopen, Request
+from urllib.parse import urlparse, urlunparse, parse_qs, urlencode
+
+# orjson（C 擴充）序列化快得多，且可直接序列化 dataclass；
+# 未安裝時退回標準函式庫（以 asdict 轉換 dataclass），輸出內容相同
+try:
+    import orjson
+
+    def _dumps(data, compact=False):
+        return orjson.dumps(data, option=None if compact else orjson.OPT_INDENT_2)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(data, compact=False):
+        if compact:
+            return json.dumps(data, ensure_ascii=False, separators=(",", ":"),
+                              default=asdict).encode("utf-8")
+        return json.dumps(data, ensure_ascii=False, indent=2, default=asdict).encode("utf-8")
+
+    _loads = json.loads
+
+# 資料來源頁面
+DATA_GOV_API = "https://data.gov.tw/api/v2/rest/dataset/14718"
+
+# 從資源說明擷取民國年份（例如「113年…辦公日曆表」）
+_YEAR_RE = re.compile(r"(\d{3})年")
+
+# HTTP 請求標頭；CSV 內容重複性高，要求壓縮傳輸可大幅減少下載量
+HTTP_HEADERS = {"User-Agent": "Mozilla/5.0", "Accept-Encoding": "gzip, deflate"}
+
+# 星期對應表
+WEEK_MAP = {
+    "0": "日", "1": "一", "2": "二", "3": "三",
+    "4": "四", "5": "五", "6": "六",
+    "日": "日", "一": "一", "二": "二", "三": "三",
+    "四": "四", "五": "五", "六": "六"
+}
+
+# 日期分隔符號（西元日期可能為 2024/01/01 或 2024-01-01），轉換時一次移除
+_DATE_SEPARATORS = str.maketrans("", "", "/-")
+
+# 「是否放假」欄位的真假值寫法
+_TRUE_VALUES = frozenset({"2", "是", "true", "True", "1"})
+_FALSE_VALUES = frozenset({"0", "否", "false", "False"})
+
+
+# 每日資料以 slots dataclass 表示，比 dict 省記憶體；欄位名稱即輸出 JSON 的鍵，順序亦同
+@dataclass(slots=True)
+class CalendarDay:
+    """單日資料（中文版，含農曆）"""
+    date: str
+    week: str
+    isHoliday: bool
+    description: str
+    lunar: dict | None
+
+
+def fetch(url, timeout):
+    """下載 URL 內容（要求 gzip/deflate 壓縮傳輸），回傳解壓後的位元組"""
+    req = Request(url, headers=HTTP_HEADERS)
+    with urlopen(req, timeout=timeout) as response:
+        content = response.read()
+        content_encoding = response.headers.get("Content-Encoding", "").lower()
+    
+    if content_encoding == "gzip":
+        return gzip.decompress(content)
+    if content_encoding == "deflate":
+        # deflate 依 RFC 應帶 zlib 標頭，但部分伺服器送的是 raw deflate
+        try:
+            return zlib.decompress(content)
+        except zlib.error:
+            return zlib.decompress(content, -zlib.MAX_WBITS)
+    return content
+
+
+def get_csv_urls():
+    """從政府資料平台 API 取得 CSV 檔案 URL 列表"""
+    print("正在取得資料來源列表...")
+    
+    data = _loads(fetch(DATA_GOV_API, timeout=30))
+    
+    csv_urls = {}
+    for dist in data.get("result", {}).get("distribution", []):
+        url = dist.get("resourceDownloadUrl", "")
+        if not url:
+            continue
+        
+        resource_format = dist.get("resourceFormat", "")
+        if resource_format.lower() != "csv":
+            continue
+        
+        resource_name = dist.get("resourceDescription", "")
+        if "Google" in resource_name:
+            continue
+        
+        match = _YEAR_RE.search(resource_name)
+        if match:
+            roc_year = int(match.group(1))
+            ad_year = roc_year + 1911
+            csv_urls[ad_year] = url
+    
+    return csv_urls
+
+
+def download_csv(url):
+    """下載 CSV 並處理編碼"""
+    print(f"  下載中: {url[:80]}...")
+    
+    parsed = urlparse(url)
+    query_params = parse_qs(parsed.query, keep_blank_values=True)
+    encoded_query = urlencode(query_params, doseq=True, safe='')
+    safe_url = urlunparse((parsed.scheme, parsed.netloc, parsed.path, 
+                           parsed.params, encoded_query, parsed.fragment))
+    
+    content = fetch(safe_url, timeout=60)
+    
+    # 有 BOM 必為 UTF-8；否則先試 UTF-8，失敗再退回 big5 / cp950（cp950 為 big5 超集）
+    if content.startswith(codecs.BOM_UTF8):
+        return content[len(codecs.BOM_UTF8):].decode("utf-8")
+    
+    for encoding in ["utf-8", "big5", "cp950"]:
+        try:
+            return content.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    
+    raise ValueError("無法解碼 CSV 檔案")
+
+
+from lunar_python import Solar
+
+def s2t(text):
+    if not text:
+        return text
+    mapping = {
+        '春节': '春節', '元宵节': '元宵節', '清明节': '清明節', '端午节': '端午節', '中秋节': '中秋節', 
+        '重阳节': '重陽節', '除夕': '除夕', '七夕节': '七夕', '腊八节': '臘八節', '小年': '小年',
+        '正月': '正月', '腊月': '臘月', '冬月': '冬月', '闰': '閏',
+        '立春': '立春', '雨水': '雨水', '惊蛰': '驚蟄', '春分': '春分', '清明': '清明', '谷雨': '穀雨',
+        '立夏': '立夏', '小满': '小滿', '芒种': '芒種', '夏至': '夏至', '小暑': '小暑', '大暑': '大暑',
+        '立秋': '立秋', '处暑': '處暑', '白露': '白露', '秋分': '秋分', '寒露': '寒露', '霜降': '霜降',
+        '立冬': '立冬', '小雪': '小雪', '大雪': '大雪', '冬至': '冬至', '小寒': '小寒', '大寒': '大寒',
+        '初一': '初一', '初二': '初二', '初三': '初三', '初四': '初四', '初五': '初五',
+        '初六': '初六', '初七': '初七', '初八': '初八', '初九': '初九', '初十': '初十',
+        '十一': '十一', '十二': '十二', '十三': '十三', '十四': '十四', '十五': '十五',
+        '十六': '十六', '十七': '十七', '十八': '十八', '十九': '十九', '二十': '二十',
+        '廿一': '廿一', '廿二': '廿二', '廿三': '廿三', '廿四': '廿四', '廿5': '廿五',
+        '廿六': '廿六', '廿七': '廿七', '廿八': '廿八', '廿九': '廿九', '三十': '三十',
+        '劳动节': '勞動節', '国庆节': '國慶節', '妇女节': '婦女節', '青年节': '青年節',
+        '儿童节': '兒童節', '建军节': '建軍節', '教师节': '教師節', '记者节': '記者節',
+        '父亲节': '父親節', '母亲节': '母親節', '万圣节': '萬聖節', '圣诞节': '聖誕節',
+        '龙': '龍', '头': '頭', '节': '節'
+    }
+    
+    # Word replacements first
+    words = {
+        '春节': '春節', '元宵节': '元宵節', '清明节': '清明節', '端午节': '端午節', '中秋节': '中秋節', 
+        '重阳节': '重陽節', '七夕节': '七夕', '腊八节': '臘八節', '惊蛰': '驚蟄', '谷雨': '穀雨',
+        '小满': '小滿', '芒种': '芒種', '处暑': '處暑', '劳动节': '勞動節', '国庆节': '國慶節',
+        '妇女节': '婦女節', '青年节': '青年節', '儿童节': '兒童節', '建军节': '建軍節', '教师节': '教師節',
+        '记者节': '記者節', '龙头节': '龍頭節'
+    }
+    
+    for s, t in words.items():
+        text = text.replace(s, t)
+        
+    # Character replace
+    res = ''
+    for char in text:
+        res += mapping.get(char, char)
+    
+    import re
+    res = re.sub(r'节', '節', res)
+    res = re.sub(r'惊', '驚', res)
+    res = re.sub(r'蛰', '蟄', res)
+    res = re.sub(r'谷', '穀', res)
+    res = re.sub(r'满', '滿', res)
+    res = re.sub(r'种', '種', res)
+    res = re.sub(r'处', '處', res)
+    res = re.sub(r'岁', '歲', res)
+    res = re.sub(r'龙', '龍', res)
+    res = re.sub(r'腊', '臘', res)
+    return res
+
+
+def compute_lunar(date_str):
+    """從西元日期字串 (YYYYMMDD) 計算農曆資訊，回傳 dict；失敗時回傳 None。
+
+    西元日期需先建立 Solar 物件再轉換為農曆，
+    直接用 Lunar.fromYmd 會把參數當成農曆日期而非公曆。
+    產生資料 (update_calendar) 與 CI 驗證 (validate_data) 共用此函式，
+    確保兩邊的農曆換算邏輯不會各寫一份而漂走。
+    """
+    try:
+        year = int(date_str[0:4])
+        month = int(date_str[4:6])
+        day = int(date_str[6:8])
+
+        lunar = Solar.fromYmd(year, month, day).getLunar()
+
+        festivals = [s2t(f) for f in lunar.getFestivals()]
+        jieQi = s2t(lunar.getJieQi())
+
+        return {
+            "date": s2t(f"{lunar.getMonthInChinese()}月{lunar.getDayInChinese()}"),
+            "festivals": festivals,
+            "solarTerm": jieQi if jieQi else None
+        }
+    except Exception as e:
+        print(f"Error calculating lunar date for {date_str}: {e}")
+        return None
+
+
+def convert_csv_to_json(csv_content):
+    """將 CSV 內容轉換為標準 JSON 格式，並加入農曆資訊"""
+    reader = csv.DictReader(StringIO(csv_content))
+    
+    # 欄位名稱只需解析一次：優先用中文欄名，沒有才用英文欄名
+    fieldnames = reader.fieldnames or []
+    date_col = "西元日期" if "西元日期" in fieldnames else "date"
+    week_col = "星期" if "星期" in fieldnames else "week"
+    holiday_col = "是否放假" if "是否放假" in fieldnames else "isHoliday"
+    desc_col = "備註" if "備註" in fieldnames else "description"
+    
+    result = []
+    for row in reader:
+        date_value = row.get(date_col, "")
+        week_value = row.get(week_col, "")
+        holiday_value = row.get(holiday_col, "")
+        desc_value = row.get(desc_col, "")
+        
+        # 空白列（或欄位不足的列）直接略過
+        if not date_value:
+            continue
+        
+        date_str = date_value.translate(_DATE_SEPARATORS)
+        if len(date_str) != 8 or not date_str.isdigit():
+            continue
+        
+        week = WEEK_MAP.get(week_value.strip() if week_value else "", week_value)
+        
+        holiday_str = holiday_value.strip() if holiday_value else ""
+        if holiday_str in _TRUE_VALUES:
+            is_holiday = True
+        elif holiday_str in _FALSE_VALUES:
+            is_holiday = False
+        else:
+            is_holiday = holiday_str == "2"
+        
+        description = desc_value.strip() if desc_value else ""
+
+        # 計算農曆資訊（與 CI 驗證共用 compute_lunar）
+        lunar_dict = compute_lunar(date_str)
+
+        result.append(CalendarDay(date_str, week, is_holiday, description, lunar_dict))
+    
+    return result
+
+
+def save_json(data, filepath, description="", compact=False):
+    """儲存 JSON 檔案；compact=True 時不縮排、不留空白（供程式讀取的子檔案）
+
+    不負責建立目錄：呼叫端（process_year）需先建好 filepath 所在的目錄。
+    """
+    with open(filepath, "wb") as f:
+        f.write(_dumps(data, compact))
+    
+    desc = f" ({description})" if description else ""
+    print(f"    ✓ {filepath.name}: {len(data)} 筆{desc}")
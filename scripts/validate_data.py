@@ -20,7 +20,7 @@ from pathlib import Path
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 sys.path.insert(0, str(SCRIPT_DIR))
-from update_calendar import compute_lunar  # noqa: E402  與產生腳本共用換算邏輯
+from calendar_common import compute_lunar  # noqa: E402  與產生腳本共用換算邏輯
 
 DATA_DIR = SCRIPT_DIR.parent / "data"
 